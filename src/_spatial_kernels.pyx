@@ -0,0 +1,39 @@
+# cython: language_level=3
+"""Compiled distance kernels for spatial_computing.
+
+Optional accelerator: build in place with ``cythonize -i src/_spatial_kernels.pyx``.
+When the extension is not built, spatial_computing falls back to numba or NumPy.
+"""
+
+cimport cython
+from cython cimport floating
+from libc.stdint cimport int64_t
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline floating _dist3_sq(const floating* a, const floating* b) noexcept nogil:
+    cdef floating dx = a[0] - b[0]
+    cdef floating dy = a[1] - b[1]
+    cdef floating dz = a[2] - b[2]
+    return dx * dx + dy * dy + dz * dz
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def range_scan(const floating[:, ::1] coords, const floating[::1] target, double r2,
+               int64_t[::1] out_idx, floating[::1] out_d2):
+    """Write indices and squared distances of rows within sqrt(r2) of target; return the hit count."""
+    cdef Py_ssize_t n = coords.shape[0]
+    cdef Py_ssize_t i, k = 0
+    cdef floating d2
+    if n == 0:
+        return 0
+    with nogil:
+        for i in range(n):
+            d2 = _dist3_sq(&coords[i, 0], &target[0])
+            if d2 <= r2:
+                out_idx[k] = i
+                out_d2[k] = d2
+                k += 1
+    return k
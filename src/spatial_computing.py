@@ -3,12 +3,23 @@
 
 from __future__ import annotations
 import argparse
+import functools
+import itertools
 import json
 import math
 import sqlite3
-from dataclasses import dataclass, asdict
+import sys
+from dataclasses import dataclass, fields
 from datetime import datetime
 from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; metadata (de)serialisation falls back to json
+    orjson = None
 
 GREEN = "\033[0;32m"
 RED = "\033[0;31m"
@@ -21,20 +32,26 @@ NC = "\033[0m"
 DB_PATH = Path.home() / ".blackroad" / "spatial-computing.db"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Point3D:
     x: float
     y: float
     z: float
 
+    def distance_sq_to(self, other: "Point3D") -> float:
+        dx = self.x - other.x
+        dy = self.y - other.y
+        dz = self.z - other.z
+        return dx * dx + dy * dy + dz * dz
+
     def distance_to(self, other: "Point3D") -> float:
-        return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2 + (self.z - other.z) ** 2)
+        return math.sqrt(self.distance_sq_to(other))
 
     def __str__(self) -> str:
         return f"({self.x:.2f}, {self.y:.2f}, {self.z:.2f})"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Zone:
     id: int
     name: str
@@ -51,7 +68,7 @@ class Zone:
         return Point3D(self.center_x, self.center_y, self.center_z)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SpatialEntity:
     id: int
     name: str
@@ -67,137 +84,464 @@ class SpatialEntity:
         return Point3D(self.x, self.y, self.z)
 
 
+# cKDTree rejects non-finite points and overflows squaring distances beyond this magnitude.
+_KDTREE_LIMIT = 1e150
+# Grid cell indices at or beyond this magnitude (or non-finite) do not fit an int64 key.
+_GRID_LIMIT = 2.0**62
+
+_ZONE_COLUMNS = ",".join(f.name for f in fields(Zone))
+_ENTITY_COLUMNS = ",".join(f.name for f in fields(SpatialEntity))
+
+
+# ---------------------------------------------------------------------------
+# Distance kernels
+# ---------------------------------------------------------------------------
+
+@functools.cache
+def _kdtree_class():
+    """Import scipy's cKDTree on first use; None when scipy is not installed."""
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:  # scipy is optional; range queries fall back to a linear scan
+        return None
+    return cKDTree
+
+
+def _prefilter_reach(cx: float, cy: float, cz: float, radius: float, eps: float) -> float:
+    """Widen radius by the rounding error a prefilter evaluated at precision eps can make."""
+    # float() keeps a float32 eps from rounding the widened radius back down to float32.
+    return radius + 16 * float(eps) * (max(abs(cx), abs(cy), abs(cz)) + radius)
+
+
+def _range_scan_numpy(coords, target, r2):
+    """Return indices and squared distances of the (N, 4) padded rows within sqrt(r2) of target."""
+    # Subtract-and-compare slab test on x first; only its survivors pay for the full d2.
+    idx = np.flatnonzero(np.abs(coords[:, 0] - target[0]) <= math.sqrt(r2))
+    diff = coords[idx] - target
+    d2 = np.einsum("ij,ij->i", diff, diff)
+    hit = d2 <= r2
+    return idx[hit], d2[hit]
+
+
+def _range_scan_loop(coords, target, r2):
+    """Loop form of the range scan, compiled with numba by _get_range_scan()."""
+    n = coords.shape[0]
+    tx, ty, tz = target[0], target[1], target[2]
+    out_idx = np.empty(n, dtype=np.int64)
+    out_d2 = np.empty(n, dtype=coords.dtype)
+    k = 0
+    for i in range(n):
+        dx = coords[i, 0] - tx
+        dy = coords[i, 1] - ty
+        dz = coords[i, 2] - tz
+        d2 = dx * dx + dy * dy + dz * dz
+        if d2 <= r2:
+            out_idx[k] = i
+            out_d2[k] = d2
+            k += 1
+    return out_idx[:k], out_d2[:k]
+
+
+@functools.cache
+def _get_range_scan():
+    """Pick the scan kernel on first use: compiled Cython, then numba, then NumPy."""
+    try:
+        from _spatial_kernels import range_scan as cy_range_scan
+    except ImportError:  # compiled kernel is optional; see _spatial_kernels.pyx for the build step
+        pass
+    else:
+        def range_scan(coords, target, r2):
+            n = coords.shape[0]
+            out_idx = np.empty(n, dtype=np.int64)
+            out_d2 = np.empty(n, dtype=coords.dtype)
+            k = cy_range_scan(coords, target, r2, out_idx, out_d2)
+            return out_idx[:k], out_d2[:k]
+        return range_scan
+    try:
+        from numba import njit
+    except ImportError:  # numba is optional; the scan falls back to NumPy broadcasting
+        return _range_scan_numpy
+    return njit(cache=True, fastmath=True)(_range_scan_loop)
+
+
 class SpatialComputing:
     """Core spatial computing engine with SQLite persistence."""
 
-    def __init__(self, db_path: Path = DB_PATH):
+    def __init__(self, db_path: Path = DB_PATH, dtype=np.float64, radius_hint: float = None):
         self.db_path = db_path
+        self.dtype = np.dtype(dtype)
+        # A typical query radius switches range queries to a uniform hash grid sized to it.
+        self._cell = None if radius_hint is None else max(radius_hint, 10.0)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._rows = None
+        self._ids = None
+        self._coords = None
+        self._tree = None
+        self._grid = None
+        self._load_snapshot = False
+        self._data_version = None
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
         self._init_db()
 
     def _init_db(self) -> None:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.executescript("""
-                CREATE TABLE IF NOT EXISTS zones (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    center_x REAL NOT NULL,
-                    center_y REAL NOT NULL,
-                    center_z REAL NOT NULL,
-                    radius REAL NOT NULL,
-                    zone_type TEXT DEFAULT 'generic',
-                    created_at TEXT NOT NULL,
-                    active INTEGER DEFAULT 1
-                );
-                CREATE TABLE IF NOT EXISTS entities (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    x REAL NOT NULL,
-                    y REAL NOT NULL,
-                    z REAL NOT NULL,
-                    entity_type TEXT DEFAULT 'object',
-                    metadata TEXT DEFAULT '{}',
-                    last_updated TEXT NOT NULL
-                );
-            """)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            CREATE TABLE IF NOT EXISTS zones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                center_x REAL NOT NULL,
+                center_y REAL NOT NULL,
+                center_z REAL NOT NULL,
+                radius REAL NOT NULL,
+                zone_type TEXT DEFAULT 'generic',
+                created_at TEXT NOT NULL,
+                active INTEGER DEFAULT 1
+            );
+            CREATE TABLE IF NOT EXISTS entities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                x REAL NOT NULL,
+                y REAL NOT NULL,
+                z REAL NOT NULL,
+                entity_type TEXT DEFAULT 'object',
+                metadata TEXT DEFAULT '{}',
+                last_updated TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entities_name ON entities(name);
+            CREATE INDEX IF NOT EXISTS idx_entities_x ON entities(x);
+        """)
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
 
     def add_zone(self, name: str, cx: float, cy: float, cz: float,
                  radius: float, zone_type: str = "generic") -> Zone:
         """Create a new 3D spatial zone."""
-        with sqlite3.connect(self.db_path) as conn:
-            now = datetime.now().isoformat()
-            cur = conn.execute(
-                "INSERT INTO zones (name,center_x,center_y,center_z,radius,zone_type,created_at)"
-                " VALUES (?,?,?,?,?,?,?)",
-                (name, cx, cy, cz, radius, zone_type, now),
-            )
-            return Zone(cur.lastrowid, name, cx, cy, cz, radius, zone_type, now, 1)
+        now = datetime.now().isoformat()
+        cur = self._conn.execute(
+            "INSERT INTO zones (name,center_x,center_y,center_z,radius,zone_type,created_at)"
+            " VALUES (?,?,?,?,?,?,?)",
+            (name, cx, cy, cz, radius, zone_type, now),
+        )
+        return Zone(cur.lastrowid, name, cx, cy, cz, radius, zone_type, now, 1)
 
     def add_entity(self, name: str, x: float, y: float, z: float,
                    entity_type: str = "object", metadata: dict = None) -> SpatialEntity:
         """Register a spatial entity at given coordinates."""
-        meta = json.dumps(metadata or {})
-        with sqlite3.connect(self.db_path) as conn:
-            now = datetime.now().isoformat()
-            cur = conn.execute(
+        meta = _dump_metadata(metadata)
+        now = datetime.now().isoformat()
+        cur = self._conn.execute(
+            "INSERT INTO entities (name,x,y,z,entity_type,metadata,last_updated)"
+            " VALUES (?,?,?,?,?,?,?)",
+            (name, x, y, z, entity_type, meta, now),
+        )
+        entity = SpatialEntity(cur.lastrowid, name, x, y, z, entity_type, meta, now)
+        self._invalidate_entities()
+        return entity
+
+    def add_zones_bulk(self, rows: Iterable[tuple]) -> int:
+        """Create many zones in one transaction; rows mirror add_zone's arguments.
+
+        All rows share a single created_at timestamp taken once per batch.
+        """
+        now = datetime.now().isoformat()
+        names = ("name", "center_x", "center_y", "center_z", "radius", "zone_type")
+        params = (_pad_row(row, names, ("generic",)) + (now,) for row in rows)
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            cur = self._conn.executemany(
+                "INSERT INTO zones (name,center_x,center_y,center_z,radius,zone_type,created_at)"
+                " VALUES (?,?,?,?,?,?,?)",
+                params,
+            )
+        return cur.rowcount
+
+    def add_entities_bulk(self, rows: Iterable[tuple]) -> int:
+        """Register many entities in one transaction; rows mirror add_entity's arguments.
+
+        All rows share a single last_updated timestamp taken once per batch.
+        """
+        now = datetime.now().isoformat()
+        names = ("name", "x", "y", "z", "entity_type", "metadata")
+
+        def params():
+            for row in rows:
+                name, x, y, z, entity_type, metadata = _pad_row(row, names, ("object", None))
+                yield name, x, y, z, entity_type, _dump_metadata(metadata), now
+
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            cur = self._conn.executemany(
                 "INSERT INTO entities (name,x,y,z,entity_type,metadata,last_updated)"
                 " VALUES (?,?,?,?,?,?,?)",
-                (name, x, y, z, entity_type, meta, now),
+                params(),
             )
-            return SpatialEntity(cur.lastrowid, name, x, y, z, entity_type, meta, now)
+        self._invalidate_entities()
+        return cur.rowcount
 
     def list_zones(self, active_only: bool = True) -> list:
         """Return all (active) zones."""
-        with sqlite3.connect(self.db_path) as conn:
-            q = "SELECT * FROM zones" + (" WHERE active=1" if active_only else "")
-            return [Zone(*r) for r in conn.execute(q).fetchall()]
+        q = f"SELECT {_ZONE_COLUMNS} FROM zones" + (" WHERE active=1" if active_only else "")
+        return [Zone(*r) for r in self._conn.execute(q).fetchall()]
 
     def list_entities(self) -> list:
         """Return all registered entities."""
-        with sqlite3.connect(self.db_path) as conn:
-            return [SpatialEntity(*r) for r in conn.execute("SELECT * FROM entities").fetchall()]
+        self._sync_entities()
+        return [SpatialEntity(*r) for r in self._entity_columns()[0]]
+
+    def _invalidate_entities(self) -> None:
+        """Drop the cached entity columns and spatial index after a write."""
+        self._rows = None
+        self._tree = None
+        self._grid = None
+        self._load_snapshot = False
+
+    def _sync_entities(self) -> None:
+        """Drop the entity snapshot if another connection has committed since it was loaded."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._invalidate_entities()
+
+    def _entity_columns(self) -> tuple:
+        """Return cached entity rows, their ids and an (N, 4) zero-padded coordinate matrix."""
+        if self._rows is None:
+            # Plain tuples are cheaper to fetch than sqlite3.Row for a full-table load.
+            cur = self._conn.cursor()
+            cur.row_factory = None
+            rows = cur.execute(f"SELECT {_ENTITY_COLUMNS} FROM entities").fetchall()
+            self._ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+            # (x, y, z, 0) rows give an even 4-wide stride, one point per SIMD register.
+            self._coords = np.zeros((len(rows), 4), dtype=self.dtype)
+            self._coords[:, :3] = np.array([r[2:5] for r in rows], dtype=self.dtype).reshape(-1, 3)
+            self._rows = rows
+        return self._rows, self._ids, self._coords
+
+    def _entity_tree(self):
+        """Return a KD-tree over the cached coordinates, or None when one cannot be used."""
+        kdtree = _kdtree_class()
+        if kdtree is None:
+            return None
+        if self._tree is None:
+            coords = self._entity_columns()[2][:, :3]
+            usable = np.isfinite(coords).all() and float(np.abs(coords).max(initial=0.0)) <= _KDTREE_LIMIT
+            self._tree = kdtree(coords) if usable else False
+        return self._tree if self._tree is not False else None
+
+    def _entity_grid(self) -> dict:
+        """Return a hash grid mapping (i, j, k) cells to the row indices they contain.
+
+        Rows whose cell cannot be computed (non-finite or beyond the int64 range) are kept
+        under the ``None`` key and returned with every grid query.
+        """
+        if self._grid is None:
+            coords = self._entity_columns()[2]
+            with np.errstate(over="ignore", invalid="ignore"):
+                scaled = np.floor(coords[:, :3].astype(np.float64) / self._cell)
+            keyable = (np.abs(scaled) < _GRID_LIMIT).all(axis=1)
+            rows = np.flatnonzero(keyable)
+            cells, inverse = np.unique(scaled[rows].astype(np.int64), axis=0, return_inverse=True)
+            members = rows[np.argsort(inverse.ravel(), kind="stable")]
+            bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(cells)))[:-1]
+            self._grid = dict(zip(map(tuple, cells.tolist()), np.split(members, bounds)))
+            self._grid[None] = np.flatnonzero(~keyable)
+        return self._grid
+
+    def _grid_candidates(self, target: np.ndarray, radius: float):
+        """Return row indices in the grid cells overlapping the query box, or None to scan."""
+        grid = self._entity_grid()
+        center = target[:3].astype(np.float64)
+        with np.errstate(over="ignore", invalid="ignore"):
+            box = np.floor(np.stack((center - radius, center + radius)) / self._cell)
+        if not (np.abs(box) < _GRID_LIMIT).all():
+            return None
+        lo, hi = box.astype(np.int64).tolist()
+        if math.prod(b - a + 1 for a, b in zip(lo, hi)) > len(grid):
+            return None
+        cells = itertools.product(*(range(a, b + 1) for a, b in zip(lo, hi)))
+        hits = [grid[c] for c in cells if c in grid]
+        hits.append(grid[None])
+        return np.sort(np.concatenate(hits))
+
+    def _candidates(self, target: np.ndarray, radius: float):
+        """Return sorted candidate row indices from the spatial index, or None to scan every row."""
+        if self._cell is not None:
+            return self._grid_candidates(target, radius)
+        tree = self._entity_tree()
+        if tree is None or not max(float(np.abs(target[:3]).max()), radius) <= _KDTREE_LIMIT:
+            return None
+        return np.asarray(tree.query_ball_point(target[:3], radius, return_sorted=True), dtype=np.intp)
+
+    def _range_query(self, cx: float, cy: float, cz: float, radius: float,
+                     exclude_id: int = None) -> list:
+        """Return (entity, distance) pairs within radius of a point, nearest first."""
+        if radius < 0:
+            return []
+        self._sync_entities()
+        if self._rows is None and not self._load_snapshot:
+            # First query since the last write: let SQLite filter instead of loading every row.
+            self._load_snapshot = True
+            return self._sql_range_query(cx, cy, cz, radius, exclude_id)
+        rows, ids, coords = self._entity_columns()
+        target = np.array((cx, cy, cz, 0.0), dtype=self.dtype)
+        # The snapshot only prefilters: widen the radius by its rounding error, then recheck
+        # the survivors in float64 so results match the SQL path whatever the snapshot dtype.
+        reach = _prefilter_reach(cx, cy, cz, radius, np.finfo(self.dtype).eps)
+        idx = self._candidates(target, reach)
+        if idx is None:
+            idx = np.arange(len(rows))
+        else:
+            coords = coords[idx]
+        # Infinite or huge coordinates legitimately overflow d2 to inf, as they do in SQLite.
+        with np.errstate(over="ignore", invalid="ignore"):
+            hit, _ = _get_range_scan()(coords, target, reach * reach)
+            idx = idx[hit]
+            if exclude_id is not None:
+                idx = idx[ids[idx] != exclude_id]
+            exact = np.array([rows[i][2:5] for i in idx.tolist()], dtype=np.float64).reshape(-1, 3)
+            dx = exact[:, 0] - cx
+            dy = exact[:, 1] - cy
+            dz = exact[:, 2] - cz
+            d2 = dx * dx + dy * dy + dz * dz
+            keep = d2 <= radius * radius
+        idx, d2 = idx[keep], d2[keep]
+        order = np.lexsort((ids[idx], d2))
+        dist = np.sqrt(d2[order])
+        return [(SpatialEntity(*rows[i]), d) for i, d in zip(idx[order].tolist(), dist.tolist())]
+
+    def _sql_range_query(self, cx: float, cy: float, cz: float, radius: float,
+                         exclude_id: int = None) -> list:
+        """Run the range filter inside SQLite and return only the matching rows."""
+        r2 = radius * radius
+        # The box is rounded apart from d2, so widen it to never drop a true hit; once r2
+        # overflows, d2 accepts everything and the box must not reject anything either.
+        reach = _prefilter_reach(cx, cy, cz, radius, np.finfo(np.float64).eps) if math.isfinite(r2) else math.inf
+        rows = self._conn.execute(
+            f"SELECT {_ENTITY_COLUMNS},"
+            " (x-:cx)*(x-:cx) + (y-:cy)*(y-:cy) + (z-:cz)*(z-:cz) AS d2"
+            " FROM entities"
+            " WHERE x BETWEEN :cx - :r AND :cx + :r"
+            " AND y BETWEEN :cy - :r AND :cy + :r"
+            " AND z BETWEEN :cz - :r AND :cz + :r"
+            " AND d2 <= :r2 AND id IS NOT :exclude ORDER BY d2, id",
+            {"cx": cx, "cy": cy, "cz": cz, "r": reach, "r2": r2, "exclude": exclude_id},
+        ).fetchall()
+        return [(SpatialEntity(*r[:-1]), math.sqrt(r["d2"])) for r in rows]
 
     def find_entities_in_zone(self, zone_name: str) -> list:
         """Return entities located inside the named zone, sorted by distance."""
-        with sqlite3.connect(self.db_path) as conn:
-            row = conn.execute("SELECT * FROM zones WHERE name=?", (zone_name,)).fetchone()
+        row = self._conn.execute(
+            f"SELECT {_ZONE_COLUMNS} FROM zones WHERE name=?", (zone_name,)
+        ).fetchone()
         if not row:
             return []
         zone = Zone(*row)
-        results = []
-        for entity in self.list_entities():
-            dist = entity.position.distance_to(zone.center)
-            if dist <= zone.radius:
-                results.append((entity, dist))
-        return sorted(results, key=lambda t: t[1])
+        return self._range_query(zone.center_x, zone.center_y, zone.center_z, zone.radius)
 
     def proximity_check(self, entity_name: str, threshold: float) -> list:
         """Find all entities within threshold distance of the named entity."""
-        with sqlite3.connect(self.db_path) as conn:
-            row = conn.execute("SELECT * FROM entities WHERE name=?", (entity_name,)).fetchone()
+        row = self._conn.execute(
+            f"SELECT {_ENTITY_COLUMNS} FROM entities WHERE name=?", (entity_name,)
+        ).fetchone()
         if not row:
             return []
         target = SpatialEntity(*row)
-        results = []
-        for entity in self.list_entities():
-            if entity.id == target.id:
-                continue
-            dist = entity.position.distance_to(target.position)
-            if dist <= threshold:
-                results.append((entity, dist))
-        return sorted(results, key=lambda t: t[1])
+        return self._range_query(target.x, target.y, target.z, threshold, exclude_id=target.id)
 
     def status(self) -> dict:
         """Return summary statistics."""
         return {
-            "active_zones": len(self.list_zones()),
-            "total_entities": len(self.list_entities()),
+            "active_zones": self._conn.execute("SELECT COUNT(*) FROM zones WHERE active=1").fetchone()[0],
+            "total_entities": self._conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0],
             "db_path": str(self.db_path),
         }
 
+    def _zone_docs(self) -> Iterator[dict]:
+        """Yield every zone as an export document."""
+        for row in self._conn.execute(f"SELECT {_ZONE_COLUMNS} FROM zones"):
+            yield dict(row)
+
+    def _entity_docs(self) -> Iterator[dict]:
+        """Yield every entity as an export document with its metadata decoded."""
+        for row in self._conn.execute(f"SELECT {_ENTITY_COLUMNS} FROM entities"):
+            doc = dict(row)
+            doc["metadata"] = _load_metadata(doc["metadata"])
+            yield doc
+
     def export_data(self) -> dict:
         """Export all spatial data as a JSON-serialisable dict."""
         return {
-            "zones": [asdict(z) for z in self.list_zones(active_only=False)],
-            "entities": [asdict(e) for e in self.list_entities()],
+            "zones": list(self._zone_docs()),
+            "entities": list(self._entity_docs()),
             "exported_at": datetime.now().isoformat(),
         }
 
+    def iter_export(self) -> Iterator[bytes]:
+        """Stream the export document as JSON byte chunks, one row per line."""
+        yield b'{"zones":['
+        for i, doc in enumerate(self._zone_docs()):
+            yield (b",\n" if i else b"\n") + _dump_json(doc)
+        yield b'\n],"entities":['
+        for i, doc in enumerate(self._entity_docs()):
+            yield (b",\n" if i else b"\n") + _dump_json(doc)
+        yield b'\n],"exported_at":' + _dump_json(datetime.now().isoformat()) + b"}\n"
+
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _fmt_zone(zone: Zone) -> None:
+def _pad_row(row, names: tuple, defaults: tuple) -> tuple:
+    """Fill a bulk row's trailing optional fields from defaults, rejecting rows of the wrong length."""
+    row = tuple(row)
+    missing = len(names) - len(row)
+    if not 0 <= missing <= len(defaults):
+        raise ValueError(
+            f"expected {len(names) - len(defaults)} to {len(names)} fields ({', '.join(names)}), "
+            f"got {len(row)}: {row!r}"
+        )
+    return row + defaults[len(defaults) - missing:]
+
+
+def _dump_metadata(metadata: dict) -> str:
+    if not metadata:
+        return "{}"
+    if orjson is not None:
+        return orjson.dumps(metadata, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(metadata)
+
+
+def _dump_json(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode()
+
+
+def _load_metadata(raw: str) -> dict:
+    if not raw or raw == "{}":
+        return {}
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _fmt_zone(zone: Zone) -> str:
     st = f"{GREEN}active{NC}" if zone.active else f"{RED}inactive{NC}"
-    print(f"  {CYAN}[{zone.id}]{NC} {BOLD}{zone.name}{NC}  center={zone.center}"
-          f"  r={zone.radius:.1f}  type={YELLOW}{zone.zone_type}{NC}  {st}")
+    return (f"  {CYAN}[{zone.id}]{NC} {BOLD}{zone.name}{NC}  center={zone.center}"
+            f"  r={zone.radius:.1f}  type={YELLOW}{zone.zone_type}{NC}  {st}")
 
 
-def _fmt_entity(entity: SpatialEntity, dist: float = None) -> None:
+def _fmt_entity(entity: SpatialEntity, dist: float = None) -> str:
     d = f"  dist={CYAN}{dist:.2f}{NC}" if dist is not None else ""
-    print(f"  {CYAN}[{entity.id}]{NC} {BOLD}{entity.name}{NC}  pos={entity.position}"
-          f"  type={YELLOW}{entity.entity_type}{NC}{d}")
+    return (f"  {CYAN}[{entity.id}]{NC} {BOLD}{entity.name}{NC}  pos={entity.position}"
+            f"  type={YELLOW}{entity.entity_type}{NC}{d}")
+
+
+def _print_lines(lines: list, empty: str) -> None:
+    sys.stdout.write("\n".join(lines) + "\n" if lines else f"  {YELLOW}{empty}{NC}\n")
 
 
 # ---------------------------------------------------------------------------
@@ -247,11 +591,11 @@ def main() -> None:
         if target == "zones":
             zones = sc.list_zones()
             print(f"\n{BOLD}{BLUE}Zones ({len(zones)}){NC}")
-            [_fmt_zone(z) for z in zones] or print(f"  {YELLOW}none{NC}")
+            _print_lines([_fmt_zone(z) for z in zones], "none")
         else:
             entities = sc.list_entities()
             print(f"\n{BOLD}{BLUE}Entities ({len(entities)}){NC}")
-            [_fmt_entity(e) for e in entities] or print(f"  {YELLOW}none{NC}")
+            _print_lines([_fmt_entity(e) for e in entities], "none")
 
     elif args.cmd == "add-zone":
         z = sc.add_zone(args.name, args.cx, args.cy, args.cz, args.radius, args.zone_type)
@@ -264,12 +608,12 @@ def main() -> None:
     elif args.cmd == "proximity":
         results = sc.proximity_check(args.entity_name, args.threshold)
         print(f"\n{BOLD}{BLUE}Entities within {args.threshold} of '{args.entity_name}'{NC}")
-        [_fmt_entity(e, d) for e, d in results] or print(f"  {YELLOW}none found{NC}")
+        _print_lines([_fmt_entity(e, d) for e, d in results], "none found")
 
     elif args.cmd == "in-zone":
         results = sc.find_entities_in_zone(args.zone_name)
         print(f"\n{BOLD}{BLUE}Entities in zone '{args.zone_name}'{NC}")
-        [_fmt_entity(e, d) for e, d in results] or print(f"  {YELLOW}none found{NC}")
+        _print_lines([_fmt_entity(e, d) for e, d in results], "none found")
 
     elif args.cmd == "status":
         st = sc.status()
@@ -279,7 +623,7 @@ def main() -> None:
         print(f"  Database:        {CYAN}{st['db_path']}{NC}")
 
     elif args.cmd == "export":
-        print(json.dumps(sc.export_data(), indent=2))
+        sys.stdout.buffer.writelines(sc.iter_export())
 
     else:
         parser.print_help()
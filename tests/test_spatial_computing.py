@@ -0,0 +1,226 @@
+"""Range queries must agree across the SQL pushdown and snapshot paths; bulk writes and export."""
+
+import json
+import math
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+import spatial_computing as sc_mod
+from spatial_computing import SpatialComputing
+
+
+def _reference(entities, cx, cy, cz, radius, exclude_id=None):
+    """Brute-force (id, distance) hits, nearest first, ties by id."""
+    hits = []
+    for eid, _, x, y, z in entities:
+        if eid == exclude_id:
+            continue
+        d2 = (x - cx) * (x - cx) + (y - cy) * (y - cy) + (z - cz) * (z - cz)
+        if radius >= 0 and d2 <= radius * radius:
+            hits.append((d2, eid))
+    return [(eid, math.sqrt(d2)) for d2, eid in sorted(hits)]
+
+
+def _ids_and_dists(results):
+    return [(e.id, d) for e, d in results]
+
+
+@pytest.fixture
+def populated_db(tmp_path):
+    db = tmp_path / "spatial.db"
+    sc = SpatialComputing(db)
+    rng = random.Random(7)
+    # Coarse integer grid coordinates produce plenty of exact distance ties.
+    rows = [(f"e{i}", rng.randint(-30, 30), rng.randint(-30, 30), rng.randint(-30, 30) * 0.5)
+            for i in range(400)]
+    sc.add_entities_bulk(rows)
+    sc.add_zones_bulk([("origin", 0, 0, 0, 12.5), ("offset", 10.25, -7, 3, 9),
+                       ("point", 5, 5, 0, 0), ("negative", 0, 0, 0, -5)])
+    entities = [(e.id, e.name, e.x, e.y, e.z) for e in sc.list_entities()]
+    zones = {z.name: z for z in sc.list_zones()}
+    sc.close()
+    return db, entities, zones
+
+
+BACKENDS = {
+    "default": lambda mp: None,
+    "numpy-scan": lambda mp: (mp.setattr(sc_mod, "_kdtree_class", lambda: None),
+                              mp.setattr(sc_mod, "_get_range_scan", lambda: sc_mod._range_scan_numpy)),
+}
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("radius_hint", [None, 15.0])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("zone_name", ["origin", "offset", "point", "negative"])
+def test_zone_query_sql_and_snapshot_match_reference(populated_db, monkeypatch, backend,
+                                                     radius_hint, dtype, zone_name):
+    db, entities, zones = populated_db
+    BACKENDS[backend](monkeypatch)
+    zone = zones[zone_name]
+    expected = _reference(entities, zone.center_x, zone.center_y, zone.center_z, zone.radius)
+    sc = SpatialComputing(db, dtype=dtype, radius_hint=radius_hint)
+    first = _ids_and_dists(sc.find_entities_in_zone(zone_name))
+    second = _ids_and_dists(sc.find_entities_in_zone(zone_name))
+    third = _ids_and_dists(sc.find_entities_in_zone(zone_name))
+    assert first == expected
+    assert second == expected
+    assert third == expected
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("radius_hint", [None, 15.0])
+@pytest.mark.parametrize("threshold", [-5.0, 0.0, 1.0, 7.5, 40.0])
+def test_proximity_sql_and_snapshot_match_reference(populated_db, monkeypatch, backend,
+                                                    radius_hint, threshold):
+    db, entities, _ = populated_db
+    BACKENDS[backend](monkeypatch)
+    target = entities[17]
+    expected = _reference(entities, *target[2:], threshold, exclude_id=target[0])
+    sc = SpatialComputing(db, radius_hint=radius_hint)
+    name = target[1]
+    assert _ids_and_dists(sc.proximity_check(name, threshold)) == expected
+    assert _ids_and_dists(sc.proximity_check(name, threshold)) == expected
+
+
+def test_snapshot_is_used_after_first_query(populated_db):
+    db, _, _ = populated_db
+    sc = SpatialComputing(db)
+    sc.find_entities_in_zone("origin")
+    assert sc._rows is None
+    sc.find_entities_in_zone("origin")
+    assert sc._rows is not None
+
+
+def test_writes_invalidate_snapshot(tmp_path):
+    sc = SpatialComputing(tmp_path / "spatial.db")
+    sc.add_zone("z", 0, 0, 0, 5)
+    sc.add_entity("a", 1, 0, 0)
+    sc.find_entities_in_zone("z")
+    sc.find_entities_in_zone("z")
+    sc.add_entity("b", 2, 0, 0)
+    assert [e.name for e, _ in sc.find_entities_in_zone("z")] == ["a", "b"]
+    assert [e.name for e, _ in sc.find_entities_in_zone("z")] == ["a", "b"]
+
+
+def test_float32_snapshot_does_not_change_answers(tmp_path):
+    sc = SpatialComputing(tmp_path / "spatial.db", dtype=np.float32)
+    sc.add_zone("far", 1e7, 0, 0, 0.4)
+    sc.add_entity("outside", 1e7 + 0.5, 0, 0)
+    sc.add_entity("a", 0, 0, 0)
+    sc.add_entity("b", 1, 1, 0)
+    for _ in range(3):
+        assert sc.find_entities_in_zone("far") == []
+        assert [d for _, d in sc.proximity_check("a", 5)] == [math.sqrt(2)]
+
+
+def test_boundary_points_match_on_both_paths(tmp_path):
+    db = tmp_path / "spatial.db"
+    sc = SpatialComputing(db)
+    rng = random.Random(11)
+    zones = [("edge-repro", -3.8909743650132578, 0.0, 0.0, 3.236545398742277)]
+    points = [("edge", -0.6544289662709806, 0.0, 0.0)]
+    for i in range(300):
+        c = [rng.uniform(-50, 50) for _ in range(3)]
+        r = rng.uniform(0.1, 10)
+        v = [rng.gauss(0, 1) for _ in range(3)]
+        norm = math.sqrt(sum(a * a for a in v))
+        zones.append((f"z{i}", *c, r))
+        points.append((f"p{i}", *(a + r * b / norm for a, b in zip(c, v))))
+    sc.add_zones_bulk(zones)
+    sc.add_entities_bulk(points)
+    entities = [(e.id, e.name, e.x, e.y, e.z) for e in sc.list_entities()]
+    sc.close()
+    for name, cx, cy, cz, r in zones:
+        expected = _reference(entities, cx, cy, cz, r)
+        fresh = SpatialComputing(db)
+        assert _ids_and_dists(fresh.find_entities_in_zone(name)) == expected
+        assert _ids_and_dists(fresh.find_entities_in_zone(name)) == expected
+        fresh.close()
+
+
+def test_far_entity_does_not_widen_other_queries(tmp_path):
+    sc = SpatialComputing(tmp_path / "spatial.db")
+    sc.add_entity("far", 1e300, 0, 0)
+    sc.add_entity("a", 0, 0, 0)
+    sc.add_entity("b", 1, 1, 0)
+    sc.add_zone("z", 0, 0, 0, 2)
+    for _ in range(3):
+        assert [(e.name, d) for e, d in sc.find_entities_in_zone("z")] == [("a", 0.0), ("b", math.sqrt(2))]
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("radius_hint", [None, 15.0])
+@pytest.mark.parametrize("far_x", [math.inf, -math.inf, 1e300])
+@pytest.mark.parametrize("threshold", [2.0, 1e160, math.inf])
+def test_extreme_coordinates_and_radii(tmp_path, monkeypatch, backend, radius_hint, far_x, threshold):
+    BACKENDS[backend](monkeypatch)
+    db = tmp_path / "spatial.db"
+    sc = SpatialComputing(db)
+    sc.add_entities_bulk([("a", 0, 0, 0), ("b", 1, 1, 0), ("far", far_x, 0, 0)])
+    sc.add_zone("z", 0, 0, 0, threshold)
+    entities = [(e.id, e.name, e.x, e.y, e.z) for e in sc.list_entities()]
+    sc.close()
+    expected = _reference(entities, 0.0, 0.0, 0.0, threshold, exclude_id=1)
+    in_zone = _reference(entities, 0.0, 0.0, 0.0, threshold)
+    fresh = SpatialComputing(db, radius_hint=radius_hint)
+    for _ in range(3):
+        assert _ids_and_dists(fresh.proximity_check("a", threshold)) == expected
+        assert _ids_and_dists(fresh.find_entities_in_zone("z")) == in_zone
+
+
+def test_bulk_inserts_pad_defaults_and_count_rows(tmp_path):
+    sc = SpatialComputing(tmp_path / "spatial.db")
+    assert sc.add_zones_bulk([("z1", 0, 0, 0, 5), ("z2", 1, 2, 3, 4, "room")]) == 2
+    assert sc.add_entities_bulk([("a", 0, 0, 0), ("b", 1, 1, 1, "robot"), ("c", 2, 2, 2, "tag", {"k": 1})]) == 3
+    assert [(z.name, z.zone_type) for z in sc.list_zones()] == [("z1", "generic"), ("z2", "room")]
+    assert [(e.name, e.entity_type, e.metadata) for e in sc.list_entities()] == [
+        ("a", "object", "{}"), ("b", "robot", "{}"), ("c", "tag", '{"k":1}'),
+    ]
+
+
+def test_bulk_insert_rolls_back_whole_batch(tmp_path):
+    sc = SpatialComputing(tmp_path / "spatial.db")
+    sc.add_zone("taken", 0, 0, 0, 1)
+    with pytest.raises(sqlite3.IntegrityError):
+        sc.add_zones_bulk([("new", 0, 0, 0, 1), ("taken", 1, 1, 1, 1)])
+    with pytest.raises(sqlite3.IntegrityError):
+        sc.add_entities_bulk([("a", 0, 0, 0), (None, 1, 1, 1)])
+    assert [z.name for z in sc.list_zones()] == ["taken"]
+    assert sc.list_entities() == []
+
+
+@pytest.mark.parametrize("method, good, bad", [
+    ("add_zones_bulk", ("ok", 0, 0, 0, 1), ("z", 0, 0, 0)),
+    ("add_zones_bulk", ("ok", 0, 0, 0, 1), ("z", 0, 0, 0, 1, "room", "extra")),
+    ("add_entities_bulk", ("ok", 0, 0, 0), ("a", 0, 0)),
+    ("add_entities_bulk", ("ok", 0, 0, 0), ("a", 0, 0, 0, "object", None, "extra")),
+])
+def test_bulk_insert_rejects_wrong_row_length(tmp_path, method, good, bad):
+    sc = SpatialComputing(tmp_path / "spatial.db")
+    with pytest.raises(ValueError, match="fields"):
+        getattr(sc, method)([good, bad])
+    assert sc.list_zones() == [] and sc.list_entities() == []
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+@pytest.mark.parametrize("empty", [True, False])
+def test_streamed_export_matches_export_data(tmp_path, monkeypatch, use_orjson, empty):
+    if not use_orjson:
+        monkeypatch.setattr(sc_mod, "orjson", None)
+    elif sc_mod.orjson is None:
+        pytest.skip("orjson not installed")
+    sc = SpatialComputing(tmp_path / "spatial.db")
+    if not empty:
+        sc.add_zones_bulk([("z1", 0, 0, 0, 5), ("z2", 1, 2, 3, 4, "room")])
+        sc.add_entities_bulk([("a", 0, 0, 0), ("b", 1.5, -2, 3, "tag", {"k": [1, 2]})])
+    streamed = json.loads(b"".join(sc.iter_export()))
+    exported = sc.export_data()
+    assert isinstance(streamed.pop("exported_at"), str)
+    exported.pop("exported_at")
+    assert streamed == exported
+    if not empty:
+        assert [e["metadata"] for e in streamed["entities"]] == [{}, {"k": [1, 2]}]